@@ -0,0 +1,44 @@
+import os, sys, json, argparse, statistics, subprocess
+
+# Tempo de início da GUI: do início do processo até a janela interativa, e o tempo de
+# carregamento do ras_checker em segundo plano. A janela precisa de display (roda gui.py de
+# verdade); sem display só os tempos de import são reportados.
+#
+#   python bench/bench_inicio.py --repeticoes 5
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def medir_import(modulo):
+    codigo = f"import time; t=time.perf_counter(); import {modulo}; print((time.perf_counter()-t)*1000)"
+    out = subprocess.run([sys.executable, "-c", codigo], cwd=RAIZ, capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+def medir_gui():
+    out = subprocess.run([sys.executable, "gui.py", "--medir-inicio"], cwd=RAIZ, capture_output=True, text=True, timeout=60)
+    for linha in reversed(out.stdout.splitlines()):
+        if linha.startswith("{"):
+            return json.loads(linha)
+    raise RuntimeError(f"gui.py não reportou tempos (code={out.returncode}): {out.stderr.strip()[-300:]}")
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeticoes", type=int, default=5)
+    args = ap.parse_args()
+
+    imports = {m: statistics.median(medir_import(m) for _ in range(args.repeticoes)) for m in ("FreeSimpleGUI", "ras_checker")}
+    for m, ms in imports.items():
+        print(f"import {m:14s} {ms:7.0f}ms")
+    try:
+        medidas = [medir_gui() for _ in range(args.repeticoes)]
+    except (RuntimeError, subprocess.TimeoutExpired) as e:
+        print(f"GUI: não foi possível medir, só imports reportados ({e})")
+        return
+    janela = statistics.median(m["janela_ms"] for m in medidas)
+    checker = statistics.median(m["checker_ms"] for m in medidas)
+    total = statistics.median(m["total_ms"] for m in medidas)
+    print(f"janela interativa   {janela:7.0f}ms")
+    print(f"ras_checker pronto  {total:7.0f}ms (import em segundo plano {checker:.0f}ms)")
+    print(f"import síncrono (antes) atrasaria a janela em ~{imports['ras_checker']:.0f}ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+import os, sys, json, time, argparse, statistics, tracemalloc
+
+# Micro-benchmark dos parsers do ras_checker sobre as capturas reais e grades sintéticas.
+# Mede tempo por chamada e pico de memória (tracemalloc), compara com
+# bench/baseline_parsers.json e sai com código 1 se algum parser regrediu.
+# O tempo é comparado relativo a uma calibração que também passa pelo bs() (a página de
+# reservas), medida antes e depois de cada caso; vale a mediana de várias repetições,
+# para que a baseline valha em outra máquina ou com a máquina mais carregada.
+#
+#   python bench/bench_parsers.py                    # compara com a baseline
+#   python bench/bench_parsers.py --gravar-baseline  # regrava a baseline nesta máquina
+
+from mock_rasweb import ler, resposta_detalhe, tabela_para
+import ras_checker
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline_parsers.json")
+TAMANHOS = (500, 1000, 2000, 5000)
+# Diferenças de memória abaixo deste piso não contam como regressão.
+PISO_KIB = 16
+ORGAOS = ["032a.Delegacia de Polícia", "147a.Delegacia de Polícia", "DEAM - Nova Iguacu", "125a.Delegacia de Polícia"]
+PERIODOS = ["08:00 - 19:59", "20:00 - 07:59", "07:00 - 18:59"]
+
+def grade_sintetica(n, dia_br="18/11/2025"):
+    """Grade grd_dia com n linhas no formato da captura; uma em cada três sem botão (ocupada)."""
+    partes = ['<table cellspacing="0" rules="all" border="1" id="ctl00_CPC_dps_data_reserva_grd_dia">',
+              '<tr><td>Data</td><td>Per&#237;odo</td><td>Org&#227;o</td><td>Perfil</td><td>&nbsp;</td></tr>']
+    for i in range(n):
+        ctl = f"ctl{i+2:02d}"
+        botao = "" if i % 3 == 2 else (
+            f'<input type="submit" name="ctl00$CPC$dps$data_reserva$grd_dia${ctl}$btn_adicionar" '
+            f'value="Confirmar Reserva" id="ctl00_CPC_dps_data_reserva_grd_dia_{ctl}_btn_adicionar" title="Confirmar" />')
+        partes.append(f'<tr style="white-space:nowrap;"><td>{dia_br}</td><td>{PERIODOS[i % len(PERIODOS)]}</td>'
+                      f'<td>{ORGAOS[i % len(ORGAOS)]}</td><td>GIP DLEGAL 1</td><td align="center">{botao}</td></tr>')
+    partes.append("</table>")
+    return resposta_detalhe(dia_br, "\n".join(partes))
+
+def casos(rapido=False):
+    login = ler("01_get_login_200.html")
+    reservas = ler("05b_reservas_again_200.html")
+    reserva_post = ler("10_reserva_post_200.html")
+    alvo = {"data_br": "18/11/2025", "orgao_req": "999ª DP", "periodo": "08:00 - 19:59"}
+    out = [
+        ("extract_hidden_map/login", lambda: ras_checker.extract_hidden_map(login)),
+        ("extract_hidden_map/reservas", lambda: ras_checker.extract_hidden_map(reservas)),
+        ("reservas_hidden_ids/reservas", lambda: ras_checker.reservas_hidden_ids(reservas)),
+        ("montar_mapping_pinpad/login", lambda: ras_checker.montar_mapping_pinpad(ras_checker.bs(login))),
+        ("extract_delta_hidden/reserva_post", lambda: ras_checker.extract_delta_hidden(reserva_post)),
+        ("extract_rows_with_buttons/reserva_post", lambda: ras_checker.extract_rows_with_buttons(reserva_post)),
+    ]
+    for dia in ("18/11/2025", "22/11/2025", "26/11/2025", "30/11/2025"):
+        texto = resposta_detalhe(dia, tabela_para(dia, indice=["18", "22", "26", "30"].index(dia[:2])))
+        out.append((f"extract_rows_with_buttons/09b_{dia[:2]}", (lambda t: lambda: ras_checker.extract_rows_with_buttons(t))(texto)))
+    for n in TAMANHOS:
+        if rapido and n > 1000:
+            continue
+        texto = grade_sintetica(n)
+        rows, _, btns = ras_checker.extract_rows_with_buttons(texto)
+        out.append((f"extract_rows_with_buttons/sintetica_{n}", (lambda t: lambda: ras_checker.extract_rows_with_buttons(t))(texto)))
+        out.append((f"extract_delta_hidden/sintetica_{n}", (lambda t: lambda: ras_checker.extract_delta_hidden(t))(texto)))
+        out.append((f"localizar_alvo/sintetica_{n}", (lambda r, b: lambda: ras_checker.localizar_alvo(r, b, alvo))(rows, btns)))
+    return out
+
+def medir(func, tempo_min=0.2, rodadas=5):
+    """Melhor tempo por chamada (s) entre 'rodadas' rodadas de pelo menos tempo_min cada."""
+    func()
+    n = 1
+    while True:
+        t0 = time.perf_counter()
+        for _ in range(n):
+            func()
+        dt = time.perf_counter() - t0
+        if dt >= tempo_min / rodadas or n >= 1 << 16:
+            break
+        n *= 2
+    melhor = dt / n
+    for _ in range(rodadas - 1):
+        t0 = time.perf_counter()
+        for _ in range(n):
+            func()
+        melhor = min(melhor, (time.perf_counter() - t0) / n)
+    return melhor
+
+def calibracao():
+    return ras_checker.bs(ler("05b_reservas_again_200.html"))
+
+def medir_relativo(func, tempo_min=0.1, repeticoes=3):
+    """(ms por chamada, custo relativo à calibração): medianas de 'repeticoes' medições."""
+    mss, rels = [], []
+    for _ in range(repeticoes):
+        antes = medir(calibracao, tempo_min / 2, 3)
+        t = medir(func, tempo_min, 3)
+        depois = medir(calibracao, tempo_min / 2, 3)
+        mss.append(t * 1000)
+        rels.append(t / ((antes + depois) / 2))
+    return statistics.median(mss), statistics.median(rels)
+
+def pico_memoria(func):
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def regrediu(rel, kib, base, tolerancia, tolerancia_memoria):
+    marca = ""
+    if rel > base["rel"] * (1 + tolerancia):
+        marca += " TEMPO"
+    if kib > base["pico_kib"] * (1 + tolerancia_memoria) and kib - base["pico_kib"] > PISO_KIB:
+        marca += " MEMORIA"
+    return marca
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--gravar-baseline", action="store_true")
+    ap.add_argument("--tolerancia", type=float, default=0.5, help="regressão de tempo aceita (0.5 = +50%%)")
+    ap.add_argument("--tolerancia-memoria", type=float, default=0.2)
+    ap.add_argument("--rapido", action="store_true", help="pula as grades sintéticas maiores")
+    ap.add_argument("--filtro", default="", help="só casos cujo nome contém este texto")
+    args = ap.parse_args()
+
+    baseline = {}
+    if os.path.exists(BASELINE):
+        with open(BASELINE, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    resultados = {}
+    regressoes = []
+    print(f"{'caso':44s} {'ms/chamada':>11s} {'relativo':>9s} {'base':>9s} {'pico KiB':>9s} {'base':>9s}")
+    for nome, func in casos(args.rapido):
+        if args.filtro not in nome:
+            continue
+        ms, rel = medir_relativo(func)
+        kib = pico_memoria(func) / 1024
+        base = baseline.get(nome)
+        marca = ""
+        if base and not args.gravar_baseline:
+            marca = regrediu(rel, kib, base, args.tolerancia, args.tolerancia_memoria)
+            if "TEMPO" in marca:
+                # Confirma com uma medição mais longa antes de acusar regressão.
+                ms2, rel2 = medir_relativo(func, tempo_min=0.3, repeticoes=7)
+                if rel2 < rel:
+                    ms, rel = ms2, rel2
+                marca = regrediu(rel, kib, base, args.tolerancia, args.tolerancia_memoria)
+            if marca:
+                regressoes.append(nome)
+        resultados[nome] = {"ms": round(ms, 4), "rel": round(rel, 4), "pico_kib": round(kib, 1)}
+        brel = f"{base['rel']:.3f}" if base else "-"
+        bkib = f"{base['pico_kib']:.1f}" if base else "-"
+        print(f"{nome:44s} {ms:11.3f} {rel:9.3f} {brel:>9s} {kib:9.1f} {bkib:>9s}{marca}")
+    if args.gravar_baseline:
+        baseline.update(resultados)
+        with open(BASELINE, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, ensure_ascii=False, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"baseline gravada em {BASELINE}")
+        return
+    if regressoes:
+        print(f"REGRESSÃO em {len(regressoes)} caso(s): {', '.join(regressoes)}")
+        sys.exit(1)
+    print("OK")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+import sys, time, argparse, tempfile, datetime, statistics
+
+# Compara a verificação serial e a pipelined (RAS_PIPELINE) de uma lista de alvos
+# contra a sessão falsa, com latência de rede simulada.
+#
+#   python bench/bench_pipeline.py --dias 10 --latencia 150
+#   python bench/bench_pipeline.py --orgao "999ª DP"      # alvo que nunca aparece na grade
+#   python bench/bench_pipeline.py --sem-reserva          # AUTO_RESERVA desligado
+
+from mock_rasweb import SessaoMock
+import ras_checker
+
+def alvos_para(dias, orgao="32ª DP", inicio=datetime.date(2025, 11, 14)):
+    return [{"data_br": (inicio + datetime.timedelta(days=i)).strftime("%d/%m/%Y"),
+             "orgao_req": orgao, "periodo": "08:00 - 19:59"} for i in range(dias)]
+
+def medir(alvos, latencia, pipeline):
+    ras_checker.PIPELINE = pipeline
+    s = SessaoMock(latencia=latencia)
+    t0 = time.perf_counter()
+    resultados = ras_checker.verificar_alvos(s, "https://rasweb.pcivil.rj.gov.br", "123", alvos)
+    dt = time.perf_counter() - t0
+    assert len(resultados) == len(alvos)
+    return dt, resultados
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--dias", type=int, default=10)
+    ap.add_argument("--latencia", type=float, default=150, help="ms por requisição")
+    ap.add_argument("--repeticoes", type=int, default=3)
+    ap.add_argument("--orgao", default="32ª DP")
+    ap.add_argument("--sem-reserva", action="store_true", help="desliga AUTO_RESERVA (padrão: como no ras_checker)")
+    args = ap.parse_args()
+
+    ras_checker.pr = lambda x: None
+    if args.sem_reserva:
+        ras_checker.AUTO_RESERVA = False
+    alvos = alvos_para(args.dias, args.orgao)
+    latencia = args.latencia / 1000.0
+    with tempfile.TemporaryDirectory() as tmp:
+        ras_checker.OUTDIR = tmp
+        tempos = {}
+        saidas = {}
+        for nome, pipeline in (("serial", False), ("pipeline", True)):
+            medidas = []
+            for _ in range(args.repeticoes):
+                dt, saidas[nome] = medir(alvos, latencia, pipeline)
+                medidas.append(dt)
+            tempos[nome] = statistics.median(medidas)
+    if saidas["serial"] != saidas["pipeline"]:
+        print("ERRO: resultados diferentes entre serial e pipeline")
+        sys.exit(1)
+    rede = args.dias * 3 * latencia
+    reservas = sum(r["reservado"] for r in saidas["serial"])
+    print(f"{args.dias} dia(s), {args.latencia:.0f}ms/req, rede mínima {rede:.3f}s, "
+          f"AUTO_RESERVA={'on' if ras_checker.AUTO_RESERVA else 'off'} ({reservas} reserva(s))")
+    for nome, dt in tempos.items():
+        print(f"  {nome:9s} {dt:.3f}s ({dt/args.dias*1000:.0f}ms/dia)")
+    print(f"  ganho     {tempos['serial'] - tempos['pipeline']:.3f}s ({tempos['serial']/tempos['pipeline']:.2f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import os, sys, re, json, time, datetime
+
+# Sessão falsa que responde ao fluxo do ras_checker com as capturas reais do repositório.
+# Usada pelos benchmarks; a latência de rede é simulada com time.sleep.
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
+
+import ras_checker
+
+FRAGMENTOS = ["09b_table_18-11-2025.fragment.html", "09b_table_22-11-2025.fragment.html",
+              "09b_table_26-11-2025.fragment.html", "09b_table_30-11-2025.fragment.html"]
+
+_cache = {}
+
+def ler(nome):
+    if nome not in _cache:
+        with open(os.path.join(RAIZ, nome), "r", encoding="utf-8") as f:
+            _cache[nome] = f.read()
+    return _cache[nome]
+
+def delta(*partes):
+    """Monta uma resposta MS-AJAX (len|tipo|id|conteúdo|) a partir de (tipo, id, conteúdo)."""
+    return "".join(f"{len(c)}|{t}|{i}|{c}|" for t, i, c in partes)
+
+def tabela_para(dia_br, indice=None):
+    """Fragmento de grade capturado, reescrito para o dia pedido."""
+    if indice is None:
+        indice = datetime.datetime.strptime(dia_br, "%d/%m/%Y").day
+    html = ler(FRAGMENTOS[indice % len(FRAGMENTOS)])
+    return re.sub(r"\d{2}/\d{2}/\d{4}", dia_br, html)
+
+def resposta_detalhe(dia_br, tabela=None, event_validation=None):
+    tabela = tabela if tabela is not None else tabela_para(dia_br)
+    return delta(("updatePanel", "ctl00_CPC_dps_upd_tela_resultado", tabela),
+                 ("hiddenField", "__VIEWSTATE", "VS_" + dia_br.replace("/", "")),
+                 ("hiddenField", "__VIEWSTATEGENERATOR", "3B430286"),
+                 ("hiddenField", "__EVENTVALIDATION", event_validation or "EV_" + dia_br.replace("/", "")))
+
+class Resposta:
+    def __init__(self, text, url, status_code=200):
+        self.text = text
+        self.url = url
+        self.status_code = status_code
+        self.content = text.encode("utf-8")
+
+class SessaoMock:
+    """Imita requests.Session para o fluxo de login/consulta/reserva.
+
+    latencia: segundos por requisição ou função sem argumentos que sorteia a latência.
+    """
+    def __init__(self, latencia=0.0, dias_disponiveis=None):
+        self.latencia = latencia
+        self.dias_disponiveis = dias_disponiveis
+        self.headers = {}
+        self.cookies = []
+        self.requisicoes = []
+
+    def _esperar(self):
+        lat = self.latencia() if callable(self.latencia) else self.latencia
+        if lat:
+            time.sleep(lat)
+
+    def responder(self, metodo, url, data=None):
+        alvo = data.get("__EVENTTARGET", "") if isinstance(data, dict) else ""
+        if url.startswith(ras_checker.LOGIN_URL):
+            if metodo == "GET":
+                return Resposta(ler("01_get_login_200.html"), url)
+            if alvo == "Entrar_lotacao":
+                return Resposta(ler("04_post_lotacao_200.html"), url)
+            return Resposta(ler("02_post_login_200.html"), url)
+        if url.endswith("/GetUserControl"):
+            dias = self.dias_disponiveis or []
+            return Resposta(json.dumps({"d": ",".join(f'"{d}"' for d in dias)}), url)
+        if alvo.endswith("btn_adicionar"):
+            return Resposta(ler("10_reserva_post_200.html"), url)
+        if alvo.endswith("btninvocadetalhe"):
+            dia_iso = data.get("ctl00$CPC$dps$hddiaselecionado", "")
+            dia_br = datetime.date.fromisoformat(dia_iso).strftime("%d/%m/%Y")
+            return Resposta(resposta_detalhe(dia_br), url)
+        if ras_checker.ENCERRA_PATH in url:
+            return Resposta(ler("99_logout_200.html"), url)
+        return Resposta(ler("05b_reservas_again_200.html"), url)
+
+    def request(self, metodo, url, data=None, **kw):
+        self._esperar()
+        self.requisicoes.append((metodo, url))
+        return self.responder(metodo, url, data)
+
+    def get(self, url, **kw):
+        return self.request("GET", url, **kw)
+
+    def post(self, url, **kw):
+        return self.request("POST", url, **kw)
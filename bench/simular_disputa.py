@@ -0,0 +1,270 @@
+import re, sys, math, time, random, argparse, datetime, tempfile, statistics
+
+# Simulador de disputa por vaga: mede com que frequência o ras_checker leva a vaga
+# contra N concorrentes, por estratégia, em muitas rodadas.
+#
+# O servidor falso entrega cada vaga ao primeiro POST btn_adicionar válido que chega; como
+# no ASP.NET, o POST só é válido com um __EVENTVALIDATION emitido numa grade que tinha o
+# botão. O fluxo do ras_checker roda de verdade (fila do ras_fila, pipeline, parsing, dumps)
+# contra a sessão falsa; a rede é simulada num relógio virtual (latência sorteada por
+# requisição), o tempo real gasto entre requisições (CPU e espera na fila) é somado a esse
+# relógio e o agendador repõe tokens pelo mesmo relógio. A latência só é sorteada a partir
+# da abertura, então todas as estratégias de uma rodada veem a mesma sequência de RTTs.
+#
+# Cenários (--cenario):
+#   nova      a vaga surge em t=0; antes disso a linha-alvo aparece sem botão.
+#   reaberta  a vaga já foi vista com botão, foi perdida (ocupada antes do clique) e volta
+#             em t=0 na mesma linha; só aqui a reserva especulativa (RAS_ESPECULATIVO) se
+#             aplica, com o layout e o __EVENTVALIDATION da grade vista antes.
+#
+#   python bench/simular_disputa.py --rodadas 300 --concorrentes 5 \
+#       --reacao lognormal:0.8,0.5 --latencia lognormal:0.15,0.4
+#   python bench/simular_disputa.py --cenario reaberta
+
+from mock_rasweb import SessaoMock, Resposta, ler, resposta_detalhe, tabela_para, delta
+import ras_checker, ras_fila
+
+BASE_URL = "https://rasweb.pcivil.rj.gov.br"
+SENHA = "50219960"
+ALVO = {"data_br": "30/11/2025", "orgao_req": "32ª DP", "periodo": "08:00 - 19:59"}
+INDICE_FRAGMENTO = 3  # 09b_table_30-11-2025: linha 1 é a 32ª DP 08:00 - 19:59
+
+def distribuicao(spec, rng):
+    """'fixo:X', 'uniforme:A,B', 'exp:MEDIA', 'normal:MEDIA,DESVIO', 'lognormal:MEDIANA,SIGMA' (segundos)."""
+    tipo, _, args = spec.partition(":")
+    p = [float(x) for x in args.split(",") if x]
+    if tipo == "fixo":
+        return lambda: p[0]
+    if tipo == "uniforme":
+        return lambda: rng.uniform(p[0], p[1])
+    if tipo == "exp":
+        return lambda: rng.expovariate(1.0 / p[0]) if p[0] > 0 else 0.0
+    if tipo == "normal":
+        return lambda: max(0.0, rng.gauss(p[0], p[1]))
+    if tipo == "lognormal":
+        mu = math.log(p[0])
+        return lambda: rng.lognormvariate(mu, p[1])
+    raise ValueError(f"distribuição inválida: {spec}")
+
+def btn_name_para_linha(idx):
+    # Linha 1 da grade é ctl02 (ctl01 é o cabeçalho).
+    return f"ctl00$CPC$dps$data_reserva$grd_dia$ctl{idx+1:02d}$btn_adicionar"
+
+class ServidorDisputa:
+    """Entrega a vaga ao primeiro POST válido; concorrentes já têm hora de chegada sorteada."""
+    def __init__(self, btn_name, chegadas_rivais):
+        self.btn_name = btn_name
+        self.primeira_rival = min(chegadas_rivais) if chegadas_rivais else float("inf")
+        self.nossa_chegada = None
+        self.venceu = False
+        self.validacoes = {}
+
+    def emitir(self, botoes):
+        """__EVENTVALIDATION de uma grade servida: só valida os botões presentes nela."""
+        ev = f"EV_{len(self.validacoes) + 1}"
+        self.validacoes[ev] = frozenset(botoes)
+        return ev
+
+    def reservar(self, btn_name, event_validation, chegada):
+        if btn_name != self.btn_name or btn_name not in self.validacoes.get(event_validation, ()) or chegada < 0:
+            return False
+        if self.nossa_chegada is None:
+            self.nossa_chegada = chegada
+            self.venceu = chegada < self.primeira_rival
+        return self.venceu
+
+class SessaoDisputa(SessaoMock):
+    """SessaoMock com relógio virtual e a vaga-alvo aberta (ou reaberta) a partir de t=0."""
+    def __init__(self, latencia, servidor, reaberta=False):
+        super().__init__(latencia=latencia, dias_disponiveis=["2025-11-30"])
+        self.servidor = servidor
+        self.reaberta = reaberta
+        self.relogio = None
+        self.requisicoes_pos_abertura = 0
+
+    def iniciar(self, t):
+        self.relogio = t
+        self._ultimo_real = time.perf_counter()
+
+    def agora(self):
+        """Relógio do agendador: real antes da abertura, virtual depois."""
+        if self.relogio is None:
+            return time.monotonic()
+        return self.relogio + time.perf_counter() - self._ultimo_real
+
+    def request(self, metodo, url, data=None, **kw):
+        alvo = data.get("__EVENTTARGET", "") if isinstance(data, dict) else ""
+        if self.relogio is None:
+            if alvo.endswith("btn_adicionar"):
+                return Resposta(resposta_reserva(False), url)
+            return self.responder(metodo, url, data)
+        lat = self.latencia()
+        self.relogio += time.perf_counter() - self._ultimo_real
+        chegada = self.relogio + lat / 2
+        self.relogio += lat
+        self.requisicoes_pos_abertura += 1
+        if alvo.endswith("btn_adicionar"):
+            ok = self.servidor.reservar(alvo, data.get("__EVENTVALIDATION", ""), chegada)
+            resp = Resposta(resposta_reserva(ok), url)
+        else:
+            resp = self.responder(metodo, url, data)
+        self._ultimo_real = time.perf_counter()
+        return resp
+
+    def responder(self, metodo, url, data=None):
+        alvo = data.get("__EVENTTARGET", "") if isinstance(data, dict) else ""
+        if alvo.endswith("btninvocadetalhe"):
+            dia_br = datetime.date.fromisoformat(data["ctl00$CPC$dps$hddiaselecionado"]).strftime("%d/%m/%Y")
+            tabela = tabela_para(dia_br, INDICE_FRAGMENTO)
+            if dia_br != ALVO["data_br"]:
+                # Dias extras: tudo ocupado, só custam rede e parsing.
+                tabela = re.sub(r'<input[^>]*btn_adicionar"[^>]*/>', "", tabela)
+            elif self.relogio is None and not self.reaberta:
+                # Vaga nova: antes da abertura a linha-alvo aparece ocupada (sem botão).
+                tabela = re.sub(r'<input[^>]*name="' + re.escape(self.servidor.btn_name) + r'"[^>]*/>', "", tabela)
+            ev = self.servidor.emitir(re.findall(r'name="([^"]*btn_adicionar)"', tabela))
+            return Resposta(resposta_detalhe(dia_br, tabela, ev), url)
+        return super().responder(metodo, url, data)
+
+def resposta_reserva(ok):
+    if ok:
+        return ler("10_reserva_post_200.html")
+    return delta(("scriptBlock", "ScriptContentNoTags", "window.alert('Vaga indisponível.');"))
+
+def login(s):
+    """Mesma sequência do main(): GET login, pinpad, POST login, POST lotação."""
+    r0 = s.get(ras_checker.LOGIN_URL, timeout=ras_checker.TIMEOUT)
+    h0 = ras_checker.extract_hidden_map(r0.text)
+    senha = ras_checker.codificar_senha(ras_checker.montar_mapping_pinpad(ras_checker.bs(r0.text)), SENHA)
+    r1 = s.post(ras_checker.LOGIN_URL, data={"__EVENTTARGET": "entrar", "__VIEWSTATE": h0["__VIEWSTATE"],
+                                             "__EVENTVALIDATION": h0["__EVENTVALIDATION"], "txtusuario": "0", "senha": senha})
+    lot = ras_checker.lotacoes(r1.text)
+    h1 = ras_checker.extract_hidden_map(r1.text)
+    r2 = s.post(ras_checker.LOGIN_URL, data={"__EVENTTARGET": "Entrar_lotacao", "__VIEWSTATE": h1["__VIEWSTATE"],
+                                             "__EVENTVALIDATION": h1["__EVENTVALIDATION"], "LBO_lotacao": lot[0][0] if lot else ""})
+    return ras_checker.pick_uso_pk_from_url(r2.url) or ras_checker.sniff_uso_pk_from_text(r2.text)
+
+def reservar_de_estado(s, uso_pk, estado):
+    bruto = ras_checker.requisitar_detalhe(s, BASE_URL, uso_pk, ALVO["data_br"], estado)
+    (rows, btns, hidden, dps_hidden, url, dia_iso), (idx, row, btn) = ras_checker.analisar_alvo(ALVO, bruto)
+    if row and row["disponivel"] and btn and btn.get("name"):
+        ras_checker.reserve_row(s, BASE_URL, uso_pk, hidden, dps_hidden, url, dia_iso, btn["name"], btn.get("value"))
+
+# Cada estratégia: (preparo antes da abertura, ação a partir da detecção). Devolve o contexto.
+def prep_nada(s):
+    return {}
+
+def prep_login(s):
+    return {"uso_pk": login(s)}
+
+def prep_login_mes(s):
+    ctx = prep_login(s)
+    ctx["estado"] = ras_checker.carregar_estado_mes(s, BASE_URL, ALVO["data_br"])
+    return ctx
+
+def prep_layout(s):
+    ctx = prep_login(s)
+    ras_checker.AUTO_RESERVA = False
+    layouts = {}
+    ras_checker.verificar_alvos(s, BASE_URL, ctx["uso_pk"], [ALVO], None, layouts)
+    ras_checker.AUTO_RESERVA = True
+    ctx["layout"] = layouts[ras_checker.chave_alvo(ALVO)]
+    return ctx
+
+def acao_frio(s, ctx):
+    uso_pk = login(s)
+    ras_checker.verificar_alvos(s, BASE_URL, uso_pk, ctx["alvos"])
+
+def acao_pre_armado(s, ctx):
+    ras_checker.verificar_alvos(s, BASE_URL, ctx["uso_pk"], ctx["alvos"])
+
+def acao_pre_armado_mes(s, ctx):
+    reservar_de_estado(s, ctx["uso_pk"], ctx["estado"])
+
+def acao_especulativo(s, ctx):
+    layout = ctx["layout"]
+    if not (layout["btn_name"] and ras_checker.reserva_especulativa(s, BASE_URL, ctx["uso_pk"], layout)):
+        acao_pre_armado(s, ctx)
+
+ESTRATEGIAS = {
+    "frio": (prep_nada, acao_frio),
+    "pre_armado": (prep_login, acao_pre_armado),
+    "pre_armado_mes": (prep_login_mes, acao_pre_armado_mes),
+    "especulativo": (prep_layout, acao_especulativo),
+}
+
+def rodada(estrategia, semente, args):
+    rng = random.Random(semente)
+    reacao = distribuicao(args.reacao, rng)
+    lat_rival = distribuicao(args.latencia_rival, rng)
+    chegadas = [reacao() + lat_rival() / 2 for _ in range(args.concorrentes)]
+    fase = distribuicao(args.fase, rng)()
+    rng_nossa = random.Random(semente * 7919 + 1)
+    servidor = ServidorDisputa(btn_name_para_linha(1), chegadas)
+    rede = SessaoDisputa(distribuicao(args.latencia, rng_nossa), servidor, args.cenario == "reaberta")
+    agendador = ras_fila.AgendadorRequisicoes(args.taxa, args.rajada, args.concorrencia, relogio=rede.agora)
+    s = ras_fila.SessaoAgendada(rede, agendador)
+    prep, acao = ESTRATEGIAS[estrategia]
+    ctx = prep(s)
+    ctx["alvos"] = [ALVO] + alvos_extras(args.alvos_extras)
+    rede.iniciar(fase)
+    # Entre o preparo e a abertura passa tempo de sobra para o balde encher.
+    agendador.tokens, agendador.ultimo = agendador.rajada, rede.agora()
+    acao(s, ctx)
+    return servidor.venceu, servidor.nossa_chegada, rede.requisicoes_pos_abertura
+
+def alvos_extras(n):
+    inicio = datetime.datetime.strptime(ALVO["data_br"], "%d/%m/%Y").date()
+    return [dict(ALVO, data_br=(inicio + datetime.timedelta(days=i)).strftime("%d/%m/%Y")) for i in range(1, n + 1)]
+
+def percentil(valores, p):
+    v = sorted(valores)
+    return v[min(len(v) - 1, int(len(v) * p))] if v else float("nan")
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rodadas", type=int, default=200)
+    ap.add_argument("--concorrentes", type=int, default=5)
+    ap.add_argument("--reacao", default="lognormal:0.8,0.5", help="tempo dos concorrentes da abertura até o clique (s)")
+    ap.add_argument("--latencia-rival", default="lognormal:0.15,0.4", help="RTT dos concorrentes (s)")
+    ap.add_argument("--latencia", default="lognormal:0.15,0.4", help="RTT do ras_checker (s)")
+    ap.add_argument("--fase", default="fixo:0", help="atraso da abertura até o ras_checker começar (s)")
+    ap.add_argument("--alvos-extras", type=int, default=0, help="dias ocupados verificados depois do alvo na mesma lista")
+    ap.add_argument("--taxa", type=float, default=ras_fila.TAXA, help="RAS_TAXA do agendador (req/s, 0 = sem limite)")
+    ap.add_argument("--rajada", type=float, default=ras_fila.RAJADA)
+    ap.add_argument("--concorrencia", type=int, default=ras_fila.CONCORRENCIA)
+    ap.add_argument("--cenario", choices=("nova", "reaberta"), default="nova")
+    ap.add_argument("--estrategias", default="", help=f"padrão: todas as do cenário ({', '.join(ESTRATEGIAS)})")
+    ap.add_argument("--semente", type=int, default=1)
+    args = ap.parse_args()
+
+    ras_checker.pr = lambda x: None
+    ras_checker.AUTO_RESERVA = True
+    # Na vaga nova o layout do preparo nunca tem botão: "especulativo" seria pre_armado.
+    validas = [e for e in ESTRATEGIAS if args.cenario == "reaberta" or e != "especulativo"]
+    estrategias = [e.strip() for e in args.estrategias.split(",") if e.strip()] or validas
+    for e in estrategias:
+        if e not in validas:
+            print(f"estratégia inválida no cenário {args.cenario}: {e} (opções: {', '.join(validas)})")
+            sys.exit(1)
+    print(f"cenário {args.cenario}: {args.rodadas} rodada(s), {args.concorrentes} concorrente(s), reação {args.reacao}, "
+          f"latência rival {args.latencia_rival}, nossa {args.latencia}, fase {args.fase}, "
+          f"{args.alvos_extras} alvo(s) extra(s), pipeline {'on' if ras_checker.PIPELINE else 'off'}, "
+          f"fila taxa={args.taxa:g} rajada={args.rajada:g} concorrência={args.concorrencia}")
+    print(f"{'estratégia':16s} {'vitórias':>9s} {'POST p50':>9s} {'p95':>8s} {'média':>8s} {'req':>5s}")
+    with tempfile.TemporaryDirectory() as tmp:
+        ras_checker.OUTDIR = tmp
+        for e in estrategias:
+            vitorias, tempos, reqs = 0, [], []
+            for i in range(args.rodadas):
+                venceu, chegada, n = rodada(e, args.semente * 100003 + i, args)
+                vitorias += venceu
+                if chegada is not None:
+                    tempos.append(chegada)
+                reqs.append(n)
+            taxa = vitorias / args.rodadas * 100
+            print(f"{e:16s} {taxa:8.1f}% {percentil(tempos, 0.5)*1000:7.0f}ms {percentil(tempos, 0.95)*1000:6.0f}ms "
+                  f"{(statistics.mean(tempos) if tempos else float('nan'))*1000:6.0f}ms {statistics.mean(reqs):5.1f}")
+
+if __name__ == "__main__":
+    main()
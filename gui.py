@@ -1,11 +1,51 @@
-import threading, io, sys, json, os, traceback, datetime, time
+import time
+_T_INICIO = time.perf_counter()
+import threading, io, sys, json, os, traceback, datetime
 import FreeSimpleGUI as sg
 
-# Importa seu script principal (mesmo diretório)
-import ras_checker  # precisa estar no mesmo diretório
+# ras_checker (requests, bs4, ...) é importado em segundo plano depois que a janela
+# aparece; quem precisa dele chama obter_checker(), que espera o carregamento.
 
 APP_TITLE = "ras-ex"
 CONFIG_FILE = "ras_gui_config.json"
+IMPORT_BUDGET_MS = float(os.environ.get("RAS_IMPORT_BUDGET_MS", "1500"))
+
+_checker = {"modulo": None, "erro": None, "ms": None, "thread": None}
+_checker_pronto = threading.Event()
+_checker_lock = threading.Lock()
+
+def _carregar_checker():
+    t0 = time.perf_counter()
+    try:
+        import ras_checker  # precisa estar no mesmo diretório
+        _checker["modulo"] = ras_checker
+    except Exception as e:
+        _checker["erro"] = e
+    _checker["ms"] = (time.perf_counter() - t0) * 1000
+    _checker_pronto.set()
+
+def carregar_checker_em_segundo_plano():
+    with _checker_lock:
+        if _checker["thread"] is None:
+            _checker["thread"] = threading.Thread(target=_carregar_checker, daemon=True)
+            _checker["thread"].start()
+
+def obter_checker():
+    carregar_checker_em_segundo_plano()
+    _checker_pronto.wait()
+    if _checker["erro"] is not None:
+        raise _checker["erro"]
+    return _checker["modulo"]
+
+def aguardar_checker_thread(window):
+    """Informa no log o tempo de carregamento do ras_checker e se passou do orçamento."""
+    _checker_pronto.wait()
+    if _checker["erro"] is not None:
+        window.write_event_value("-APPEND_LOG-", f"[INICIO] falha ao carregar ras_checker: {_checker['erro']}\n")
+        return
+    ms = _checker["ms"]
+    aviso = f" (acima do orçamento de {IMPORT_BUDGET_MS:.0f}ms)" if ms > IMPORT_BUDGET_MS else ""
+    window.write_event_value("-APPEND_LOG-", f"[INICIO] ras_checker carregado em {ms:.0f}ms{aviso}\n")
 
 # Variável global para controlar o agendamento
 scheduled_thread = None
@@ -27,6 +67,7 @@ def load_config(path=CONFIG_FILE):
         "RAS_TIMEOUT": "30",
         "RAS_ALVOS": "",  # multiline
         "AUTO_RESERVA": True,
+        "PERFIL": False,
         "AGENDAR_ENABLED": False,
         "AGENDAR_DATA": datetime.date.today().strftime("%d/%m/%Y"),
         "AGENDAR_HORA": "00:00"
@@ -63,6 +104,7 @@ def build_layout(cfg):
         [sg.Text("Ano padrão"), sg.Input(cfg["RAS_ANO"], key="-ANO-", size=(10,1))],
         [sg.Text("Timeout (s)"), sg.Input(cfg["RAS_TIMEOUT"], key="-TIMEOUT-", size=(10,1))],
         [sg.Checkbox("Efetuar reserva automaticamente", default=cfg.get("AUTO_RESERVA", True), key="-AUTO_RESERVA-")],
+        [sg.Checkbox("Perfilar execução (CPU/memória)", default=cfg.get("PERFIL", False), key="-PERFIL-")],
         [sg.Text("Alvos (um por linha)")],
         [sg.Multiline(cfg["RAS_ALVOS"], key="-ALVOS-", size=(50,10), expand_x=True)],
         [sg.HorizontalSeparator()],
@@ -97,6 +139,7 @@ def apply_env_from_window(values):
     os.environ["RAS_TIMEOUT"] = values["-TIMEOUT-"].strip() or "30"
     os.environ["RAS_DEBUG_DIR"] = "."  # sempre usa diretório atual
     os.environ["RAS_AUTO_RESERVA"] = "1" if values["-AUTO_RESERVA-"] else "0"
+    os.environ["RAS_PROFILE"] = "1" if values["-PERFIL-"] else "0"
     # Preserva quebras de linha nos alvos
     alvos_raw = values["-ALVOS-"]
     os.environ["RAS_ALVOS"] = alvos_raw if isinstance(alvos_raw, str) else ""
@@ -110,11 +153,18 @@ def run_checker_thread(window):
         def gui_pr(x):
             window.write_event_value("-APPEND_LOG-", str(x) + "\n")
 
+        ras_checker = obter_checker()
+        # O import pode ter acontecido antes de apply_env_from_window: relê os RAS_* da janela.
+        ras_checker.ler_config()
         old_pr = getattr(ras_checker, "pr", print)
         setattr(ras_checker, "pr", gui_pr)
 
         try:
-            ras_checker.main()
+            if os.environ.get("RAS_PROFILE") == "1":
+                import ras_perfil
+                ras_perfil.executar_com_perfil(ras_checker.main, ras_checker.OUTDIR, log=gui_pr)
+            else:
+                ras_checker.main()
         finally:
             # restaura pr por segurança
             setattr(ras_checker, "pr", old_pr)
@@ -181,6 +231,18 @@ def main():
 
     layout = build_layout(load_config())
     window = sg.Window(APP_TITLE, layout, resizable=True, finalize=True)
+    window.read(timeout=0)
+    janela_ms = (time.perf_counter() - _T_INICIO) * 1000
+    carregar_checker_em_segundo_plano()
+    if "--medir-inicio" in sys.argv:
+        # Usado por bench/bench_inicio.py: imprime os tempos e sai.
+        obter_checker()
+        print(json.dumps({"janela_ms": janela_ms, "checker_ms": _checker["ms"],
+                          "total_ms": (time.perf_counter() - _T_INICIO) * 1000}), flush=True)
+        window.close()
+        return
+    window["-LOG-"].write(f"[INICIO] janela pronta em {janela_ms:.0f}ms\n")
+    threading.Thread(target=aguardar_checker_thread, args=(window,), daemon=True).start()
 
     # Se quiser redirecionar prints deste arquivo para o log:
     # stream_gui = StreamToGUI(window["-LOG-"])
@@ -211,6 +273,7 @@ def main():
                 "RAS_TIMEOUT": values["-TIMEOUT-"],
                 "RAS_ALVOS": values["-ALVOS-"],
                 "AUTO_RESERVA": values["-AUTO_RESERVA-"],
+                "PERFIL": values["-PERFIL-"],
                 "AGENDAR_ENABLED": values["-AGENDAR_ENABLED-"],
                 "AGENDAR_DATA": values["-AGENDAR_DATA-"],
                 "AGENDAR_HORA": values["-AGENDAR_HORA-"],
@@ -228,6 +291,7 @@ def main():
                 "-TIMEOUT-": cfg["RAS_TIMEOUT"],
                 "-ALVOS-": cfg["RAS_ALVOS"],
                 "-AUTO_RESERVA-": cfg.get("AUTO_RESERVA", True),
+                "-PERFIL-": cfg.get("PERFIL", False),
                 "-AGENDAR_ENABLED-": cfg.get("AGENDAR_ENABLED", False),
                 "-AGENDAR_DATA-": cfg.get("AGENDAR_DATA", datetime.date.today().strftime("%d/%m/%Y")),
                 "-AGENDAR_HORA-": cfg.get("AGENDAR_HORA", "00:00"),
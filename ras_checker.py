@@ -1,19 +1,36 @@
-import os, re, sys, datetime, json
+import os, re, sys, html, datetime, json, time
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urljoin, urlparse, parse_qs, unquote
 import requests
 from bs4 import BeautifulSoup
+import ras_historico, ras_fila, ras_metricas
 
 LOGIN_URL = "https://rasweb.pcivil.rj.gov.br/p_login.aspx"
 RESERVAS_PATH = "/FRMRESERVARVAGASERVIDOR.ASPX"
 ABERTURA_PATH = "/Abertura.aspx"
 ENCERRA_PATH = "/Encerra.aspx"
 
-DIA_ALVO_BR = os.environ.get("RAS_DIA", "22/11/2025")
-OUTDIR = os.environ.get("RAS_DEBUG_DIR", ".")
-TIMEOUT = int(os.environ.get("RAS_TIMEOUT", "30"))
-ALVOS_INPUT = os.environ.get("RAS_ALVOS", "").strip()
-ANO_PADRAO = os.environ.get("RAS_ANO", str(datetime.date.today().year))
-AUTO_RESERVA = os.environ.get("RAS_AUTO_RESERVA", "1").strip() not in ("0","false","False","no","n")
+def ler_config():
+    """(Re)lê as configurações RAS_* do ambiente; a GUI chama antes de cada execução."""
+    global DIA_ALVO_BR, OUTDIR, TIMEOUT, ALVOS_INPUT, ANO_PADRAO, AUTO_RESERVA
+    global PIPELINE, POLL, POLL_MIN, POLL_MAX, POLL_BASE, POLL_MAX_CICLOS
+    global ESPECULATIVO, ESPECULATIVO_PESO
+    DIA_ALVO_BR = os.environ.get("RAS_DIA", "22/11/2025")
+    OUTDIR = os.environ.get("RAS_DEBUG_DIR", ".")
+    TIMEOUT = int(os.environ.get("RAS_TIMEOUT", "30"))
+    ALVOS_INPUT = os.environ.get("RAS_ALVOS", "").strip()
+    ANO_PADRAO = os.environ.get("RAS_ANO", str(datetime.date.today().year))
+    AUTO_RESERVA = os.environ.get("RAS_AUTO_RESERVA", "1").strip() not in ("0","false","False","no","n")
+    PIPELINE = os.environ.get("RAS_PIPELINE", "1").strip() not in ("0","false","False","no","n")
+    POLL = os.environ.get("RAS_POLL", "0").strip() not in ("0","false","False","no","n","")
+    POLL_MIN = float(os.environ.get("RAS_POLL_MIN", "20"))
+    POLL_MAX = float(os.environ.get("RAS_POLL_MAX", "300"))
+    POLL_BASE = float(os.environ.get("RAS_POLL_BASE", "60"))
+    POLL_MAX_CICLOS = int(os.environ.get("RAS_POLL_MAX_CICLOS", "0"))
+    ESPECULATIVO = os.environ.get("RAS_ESPECULATIVO", "0").strip() not in ("0","false","False","no","n","")
+    ESPECULATIVO_PESO = float(os.environ.get("RAS_ESPECULATIVO_PESO", "0.5"))  # peso mínimo da hora (0..1) no histórico
+
+ler_config()
 
 def pr(x): print(x, flush=True)
 
@@ -201,6 +218,7 @@ def follow_msajax_with_fallback(session, url_candidate, label, timeout=TIMEOUT):
                 pr(f"[{label}] fallback -> {fallback}")
                 r2 = session.get(fallback, timeout=timeout, allow_redirects=True)
                 pr(f"[{label}] fallback code={r2.status_code} url={r2.url}")
+                ras_metricas.RECUPERACOES.inc("fallback_https")
                 return r2
             except requests.exceptions.RequestException as e2:
                 pr(f"[{label}] fallback falhou: {e2}")
@@ -267,9 +285,8 @@ def matches_orgao(orgao_row, key):
         return key["texto"].lower() in t.lower()
     return False
 
-def fetch_rows_for_date(session, base_url, uso_pk, dia_br, anomesref_hint=None):
+def carregar_estado_mes(session, base_url, dia_br, anomesref_hint=None):
     rpage = session.get(base_url + RESERVAS_PATH, timeout=TIMEOUT)
-    dump("05b_reservas_again", rpage)
     reservas_hidden = extract_hidden_map(rpage.text, names=["__VIEWSTATE","__VIEWSTATEGENERATOR","__EVENTVALIDATION","ctl00$ScriptManager1_HiddenField"])
     dps_hidden = reservas_hidden_ids(rpage.text)
     anomesref = dps_hidden.get("ctl00_CPC_dps_hdanomesref","") or (anomesref_hint or "")
@@ -288,9 +305,17 @@ def fetch_rows_for_date(session, base_url, uso_pk, dia_br, anomesref_hint=None):
     }
     payload_json = {"anomesref": anomesref or re.sub(r"[^0-9]","", datetime.datetime.strptime(dia_br, "%d/%m/%Y").strftime("%Y%m")), "tipoperfilvaga": tipoperfilvaga, "depoid": depoid, "usuaid": usuaid}
     r_getuc = session.post(getuc_url, headers=headers_json, data=json.dumps(payload_json), timeout=TIMEOUT)
-    dump("06b_getusercontrol", r_getuc)
     available_dates = extract_available_dates_from_json(r_getuc.text)
     dates_raw_str = ",".join(f"\"{d}\"" for d in available_dates)
+    return {"rpage": rpage, "r_getuc": r_getuc, "reservas_hidden": reservas_hidden, "dps_hidden": dps_hidden,
+            "anomesref": anomesref, "depoid": depoid, "usuaid": usuaid, "tipoperfilvaga": tipoperfilvaga,
+            "dates_raw_str": dates_raw_str, "reservas_url_final": reservas_url_final}
+
+def requisitar_detalhe(session, base_url, uso_pk, dia_br, estado):
+    reservas_hidden = estado["reservas_hidden"]
+    reservas_url_final = estado["reservas_url_final"]
+    anomesref, depoid, usuaid, tipoperfilvaga = estado["anomesref"], estado["depoid"], estado["usuaid"], estado["tipoperfilvaga"]
+    dates_raw_str = estado["dates_raw_str"]
     dia_iso = to_iso(dia_br)
     script_field = "ctl00$CPC$dps$upd_tela_resultado|ctl00$CPC$dps$btninvocadetalhe"
     payload_async = {
@@ -331,6 +356,20 @@ def fetch_rows_for_date(session, base_url, uso_pk, dia_br, anomesref_hint=None):
         "Referer": reservas_url_final,
     }
     rday = session.post(reservas_url_final, data=payload_async, headers=headers_ajax, timeout=TIMEOUT)
+    return {"dia_br": dia_br, "dia_iso": dia_iso, "estado": estado, "rday": rday}
+
+def requisitar_dia(session, base_url, uso_pk, dia_br, anomesref_hint=None):
+    # Parte de rede da consulta de um dia: GET da página, GetUserControl e POST de detalhe.
+    estado = carregar_estado_mes(session, base_url, dia_br, anomesref_hint)
+    return requisitar_detalhe(session, base_url, uso_pk, dia_br, estado)
+
+def processar_dia(bruto):
+    # Parte local: dumps e parsing da resposta de requisitar_dia (pode rodar em outra thread).
+    estado, rday, dia_br, dia_iso = bruto["estado"], bruto["rday"], bruto["dia_br"], bruto["dia_iso"]
+    reservas_hidden, dps_hidden = estado["reservas_hidden"], estado["dps_hidden"]
+    reservas_url_final = estado["reservas_url_final"]
+    dump("05b_reservas_again", estado["rpage"])
+    dump("06b_getusercontrol", estado["r_getuc"])
     dump(f"07b_post_async_{dia_br.replace('/','-')}", rday)
     hidden_delta = extract_delta_hidden(rday.text)
     rows, table_html, btns = extract_rows_with_buttons(rday.text)
@@ -343,6 +382,9 @@ def fetch_rows_for_date(session, base_url, uso_pk, dia_br, anomesref_hint=None):
     }
     return rows, btns, hidden_final, dps_hidden, reservas_url_final, dia_iso
 
+def fetch_rows_for_date(session, base_url, uso_pk, dia_br, anomesref_hint=None):
+    return processar_dia(requisitar_dia(session, base_url, uso_pk, dia_br, anomesref_hint))
+
 def reserve_row(session, base_url, uso_pk, hidden_fields, dps_hidden, reservas_url_final, dia_iso, btn_name, btn_value):
     payload = {
         "ctl00$ScriptManager1": f"ctl00$CPC$dps$upd_tela_resultado|{btn_name}",
@@ -380,11 +422,181 @@ def reserve_row(session, base_url, uso_pk, hidden_fields, dps_hidden, reservas_u
     ok = ("RESERVA EFETUADA" in r.text.upper()) or ("RESERVADA" in r.text.upper()) or ("SUCESSO" in r.text.upper())
     return ok, r
 
+def chave_alvo(alvo):
+    return (alvo["data_br"], alvo["orgao_req"], alvo["periodo"])
+
+def reserva_especulativa(s, base_url, uso_pk, layout):
+    """Dispara o POST de reserva direto do layout/estado da consulta anterior, sem o POST de detalhe."""
+    btn_name = layout["btn_name"]
+    pr(f"[ESPECULATIVO] Reserva direta da linha {layout['linha']} ({btn_name})")
+    try:
+        ok, r = reserve_row(s, base_url, uso_pk, layout["hidden"], layout["dps_hidden"], layout["url"], layout["dia_iso"], btn_name, layout["btn_value"] or "Confirmar Reserva")
+    except requests.exceptions.RequestException as e:
+        pr(f"[ESPECULATIVO] falha: {e}")
+        return False
+    pr(f"[ESPECULATIVO] Resultado: {'OK' if ok else 'NOK'} | code={r.status_code}")
+    ras_metricas.reserva(ok, "especulativo")
+    return ok
+
+def localizar_alvo(rows, btns, alvo):
+    key = orgao_key_from_req(alvo["orgao_req"]) if alvo["orgao_req"] else None
+    periodo_req = alvo["periodo"]
+    dia_fmt = datetime.datetime.strptime(alvo["data_br"], "%d/%m/%Y").strftime("%d/%m/%Y")
+    for idx, r in enumerate(rows, start=1):
+        cond_data = r["data"].strip() == dia_fmt
+        cond_periodo = (periodo_req == "" or r["periodo"].strip() == periodo_req)
+        cond_orgao = True if not key else matches_orgao(r["orgao"], key)
+        if cond_data and cond_periodo and cond_orgao:
+            return idx, r, (btns[idx-1] if idx-1 < len(btns) else None)
+    return None, None, None
+
+def alvo_com_botao(ms_text, alvo):
+    """Teste barato, sem montar a árvore: alguma linha com botão de reserva casa com o alvo?"""
+    key = orgao_key_from_req(alvo["orgao_req"]) if alvo["orgao_req"] else None
+    for trecho in re.split(r"<tr\b", ms_text, flags=re.I)[1:]:
+        if "btn_adicionar" not in trecho:
+            continue
+        tds = [html.unescape(re.sub(r"<[^>]+>", "", td)).strip() for td in re.findall(r"<td[^>]*>([\s\S]*?)</td>", trecho, re.I)]
+        if len(tds) < 3 or tds[0] != alvo["data_br"]:
+            continue
+        if (not alvo["periodo"] or tds[1] == alvo["periodo"]) and (not key or matches_orgao(tds[2], key)):
+            return True
+    return False
+
+def analisar_alvo(alvo, bruto, historico=None):
+    dados = processar_dia(bruto)
+    rows, btns = dados[0], dados[1]
+    ras_metricas.marcar_grade()
+    if historico is not None:
+        try:
+            ras_historico.registrar_snapshot(historico, alvo["data_br"], rows)
+        except Exception as e:
+            pr(f"[HISTORICO] falha ao registrar {alvo['data_br']}: {e}")
+    return dados, localizar_alvo(rows, btns, alvo)
+
+def pipeline_alvos(s, base_url, uso_pk, alvos, processar, aguardar=None):
+    """Gera (alvo, processar(alvo, bruto)) na ordem dos alvos, sobrepondo rede e parsing.
+
+    As requisições seguem serializadas nesta thread, na ordem que o servidor espera
+    (página -> GetUserControl -> detalhe); só o processamento do dia N roda no worker
+    enquanto o dia N+1 está em rede. O dia N é entregue assim que o worker termina,
+    conferido antes de cada etapa de rede do dia N+1. Se aguardar(alvo, bruto) do dia N for
+    verdadeiro (ex.: a linha do alvo tem botão de reserva), o dia N+1 só começa depois de o dia N
+    ser entregue, para que o POST de reserva do consumidor vá antes de qualquer
+    requisição do dia seguinte.
+    """
+    with ThreadPoolExecutor(max_workers=1) as worker:
+        anterior = None
+        for alvo in alvos:
+            if anterior and (anterior[1].done() or (aguardar and aguardar(anterior[0], anterior[2]))):
+                yield anterior[0], anterior[1].result()
+                anterior = None
+            estado = carregar_estado_mes(s, base_url, alvo["data_br"])
+            if anterior and anterior[1].done():
+                yield anterior[0], anterior[1].result()
+                anterior = None
+            bruto = requisitar_detalhe(s, base_url, uso_pk, alvo["data_br"], estado)
+            fut = worker.submit(processar, alvo, bruto)
+            if anterior:
+                yield anterior[0], anterior[1].result()
+            anterior = (alvo, fut, bruto)
+        if anterior:
+            yield anterior[0], anterior[1].result()
+
+def verificar_alvos(s, base_url, uso_pk, alvos, historico=None, layouts=None):
+    registradas = set()
+    def processar(alvo, bruto):
+        # Uma captura por data por verificação: dois alvos no mesmo dia não viram duas observações.
+        novo = alvo["data_br"] not in registradas
+        registradas.add(alvo["data_br"])
+        return analisar_alvo(alvo, bruto, historico if novo else None)
+    if PIPELINE and len(alvos) > 1:
+        com_botao = lambda alvo, bruto: AUTO_RESERVA and alvo_com_botao(bruto["rday"].text, alvo)
+        etapas = pipeline_alvos(s, base_url, uso_pk, alvos, processar, com_botao)
+    else:
+        etapas = ((alvo, processar(alvo, requisitar_dia(s, base_url, uso_pk, alvo["data_br"]))) for alvo in alvos)
+    resultados = []
+    for alvo, (dados, (match_idx, match_row, match_btn)) in etapas:
+        data_br = alvo["data_br"]
+        rows, btns, hidden_fields, dps_hidden, reservas_url_final, dia_iso = dados
+        periodo_req = alvo["periodo"]
+        if match_row:
+            res = {"data": data_br, "orgao_req": alvo["orgao_req"], "periodo": periodo_req, "linha": match_idx, "disponivel": match_row["disponivel"], "orgao_real": match_row["orgao"], "reservado": False}
+            pr(f"[TARGET] {data_br} - {alvo['orgao_req']} - {periodo_req} -> {'DISPONÍVEL' if match_row['disponivel'] else 'OCUPADA'} (linha {match_idx})")
+            if layouts is not None:
+                layouts[chave_alvo(alvo)] = {"linha": match_idx, "btn_name": (match_btn or {}).get("name"), "btn_value": (match_btn or {}).get("value"),
+                                             "hidden": hidden_fields, "dps_hidden": dps_hidden, "url": reservas_url_final, "dia_iso": dia_iso}
+            if AUTO_RESERVA and match_row["disponivel"] and match_btn and match_btn.get("name"):
+                pr(f"[RESERVA] Disparando reserva da linha {match_idx} ({match_btn['name']})")
+                ok, r = reserve_row(s, base_url, uso_pk, hidden_fields, dps_hidden, reservas_url_final, dia_iso, match_btn["name"], match_btn.get("value"))
+                pr(f"[RESERVA] Resultado: {'OK' if ok else 'NOK'} | code={r.status_code}")
+                ras_metricas.reserva(ok)
+                res["reservado"] = ok
+            resultados.append(res)
+        else:
+            resultados.append({"data": data_br, "orgao_req": alvo["orgao_req"], "periodo": periodo_req, "linha": None, "disponivel": False, "orgao_real": None, "reservado": False})
+            pr(f"[TARGET] {data_br} - {alvo['orgao_req']} - {periodo_req} -> NÃO ENCONTRADO")
+            if layouts is not None:
+                layouts.pop(chave_alvo(alvo), None)
+    return resultados
+
+def filtro_alvos(alvos):
+    chaves = [(orgao_key_from_req(a["orgao_req"]) if a["orgao_req"] else None, a["periodo"]) for a in alvos]
+    def filtro(row):
+        return any((not key or matches_orgao(row["orgao"], key)) and (not periodo or row["periodo"].strip() == periodo) for key, periodo in chaves)
+    return filtro
+
+def polling_alvos(s, base_url, uso_pk, alvos, resultados, historico=None, layouts=None):
+    # Repete a verificação dos alvos ainda não reservados, com intervalo guiado pelo histórico.
+    # Com RAS_ESPECULATIVO, alvos cuja última grade tinha o botão de reserva tentam primeiro a
+    # reserva direta pelo layout dessa consulta, só em horas com peso de liberação de pelo
+    # menos RAS_ESPECULATIVO_PESO (ou sem histórico); se o servidor recusar, seguem pelo caminho normal.
+    layouts = {} if layouts is None else layouts
+    pendentes = [a for a, r in zip(alvos, resultados) if not r["reservado"]]
+    finais = {(r["data"], r["orgao_req"], r["periodo"]): r for r in resultados}
+    agendador = ras_historico.AgendadorPolling(historico, filtro_alvos(alvos), POLL_MIN, POLL_MAX, POLL_BASE)
+    ciclo = 0
+    while pendentes and (not POLL_MAX_CICLOS or ciclo < POLL_MAX_CICLOS):
+        ciclo += 1
+        espera = agendador.proximo_intervalo()
+        pr(f"[POLL] ciclo {ciclo}: {len(pendentes)} alvo(s) pendente(s); próxima consulta em {espera:.0f}s")
+        time.sleep(espera)
+        peso = agendador.peso(datetime.datetime.now())
+        if ESPECULATIVO and AUTO_RESERVA and (peso is None or peso >= ESPECULATIVO_PESO):
+            restantes = []
+            for a in pendentes:
+                layout = layouts.get(chave_alvo(a))
+                if layout and layout["btn_name"] and reserva_especulativa(s, base_url, uso_pk, layout):
+                    r = finais[chave_alvo(a)]
+                    finais[chave_alvo(a)] = dict(r, disponivel=True, reservado=True)
+                    pr(f"[TARGET] {a['data_br']} - {a['orgao_req']} - {a['periodo']} -> RESERVADA (especulativo, linha {layout['linha']})")
+                else:
+                    restantes.append(a)
+            pendentes = restantes
+            if not pendentes:
+                break
+        novos = verificar_alvos(s, base_url, uso_pk, pendentes, historico, layouts)
+        for r in novos:
+            finais[(r["data"], r["orgao_req"], r["periodo"])] = r
+        pendentes = [a for a, r in zip(pendentes, novos) if not r["reservado"]]
+        agendador.atualizar()
+        try:
+            ras_metricas.gravar_textfile()
+        except OSError as e:
+            pr(f"[METRICAS] falha ao gravar: {e}")
+    return [finais[(a["data_br"], a["orgao_req"], a["periodo"])] for a in alvos]
+
 def main():
     user, senha = ensure_creds()
-    s = requests.Session()
+    agendador = ras_fila.agendador_para(user)
+    s = ras_fila.SessaoAgendada(requests.Session(), agendador, ras_metricas.observar_requisicao)
+    try:
+        ras_metricas.servir()
+    except OSError as e:
+        pr(f"[METRICAS] endpoint indisponível (porta {ras_metricas.METRICS_PORT}): {e}")
     s.headers.update({"User-Agent":"Mozilla/5.0 (Macintosh; Intel Mac OS X) AppleWebKit/537.36 Chrome/120 Safari/537.36"})
     uso_pk = None
+    historico = None
     try:
         pr("[STEP] GET login")
         r0 = s.get(LOGIN_URL, timeout=TIMEOUT)
@@ -416,6 +628,7 @@ def main():
         dump("02_post_login", r1)
         if is_duplicate_session(r1.text):
             pr("[INFO] Sessão duplicada detectada. Assumindo sessão anterior...")
+            ras_metricas.RECUPERACOES.inc("sessao_duplicada")
             h1_dup = extract_hidden_map(r1.text)
             print_hidden_summary("duplicate_session", h1_dup)
             payload_confirm = {
@@ -492,35 +705,18 @@ def main():
         else:
             alvos = parse_alvos(ALVOS_INPUT)
         pr("[ALVOS] " + json.dumps(alvos, ensure_ascii=False))
-        resultados = []
-        for alvo in alvos:
-            data_br = alvo["data_br"]
-            rows, btns, hidden_fields, dps_hidden, reservas_url_final, dia_iso = fetch_rows_for_date(s, base_url, uso_pk, data_br)
-            key = orgao_key_from_req(alvo["orgao_req"]) if alvo["orgao_req"] else None
-            periodo_req = alvo["periodo"]
-            dia_fmt = datetime.datetime.strptime(data_br, "%d/%m/%Y").strftime("%d/%m/%Y")
-            match_idx = None
-            match_row = None
-            match_btn = None
-            for idx, r in enumerate(rows, start=1):
-                cond_data = r["data"].strip() == dia_fmt
-                cond_periodo = (periodo_req == "" or r["periodo"].strip() == periodo_req)
-                cond_orgao = True if not key else matches_orgao(r["orgao"], key)
-                if cond_data and cond_periodo and cond_orgao:
-                    match_idx = idx
-                    match_row = r
-                    match_btn = btns[idx-1] if idx-1 < len(btns) else None
-                    break
-            if match_row:
-                resultados.append({"data": data_br, "orgao_req": alvo["orgao_req"], "periodo": periodo_req, "linha": match_idx, "disponivel": match_row["disponivel"], "orgao_real": match_row["orgao"]})
-                pr(f"[TARGET] {data_br} - {alvo['orgao_req']} - {periodo_req} -> {'DISPONÍVEL' if match_row['disponivel'] else 'OCUPADA'} (linha {match_idx})")
-                if AUTO_RESERVA and match_row["disponivel"] and match_btn and match_btn.get("name"):
-                    pr(f"[RESERVA] Disparando reserva da linha {match_idx} ({match_btn['name']})")
-                    ok, r = reserve_row(s, base_url, uso_pk, hidden_fields, dps_hidden, reservas_url_final, dia_iso, match_btn["name"], match_btn.get("value"))
-                    pr(f"[RESERVA] Resultado: {'OK' if ok else 'NOK'} | code={r.status_code}")
-            else:
-                resultados.append({"data": data_br, "orgao_req": alvo["orgao_req"], "periodo": periodo_req, "linha": None, "disponivel": False, "orgao_real": None})
-                pr(f"[TARGET] {data_br} - {alvo['orgao_req']} - {periodo_req} -> NÃO ENCONTRADO")
+        try:
+            historico = ras_historico.abrir()
+            ultima = historico and ras_historico.ultima_captura(historico)
+            if ultima:
+                ras_metricas.marcar_grade(ultima.timestamp())
+        except Exception as e:
+            pr(f"[HISTORICO] indisponível, seguindo sem histórico: {e}")
+            historico = None
+        layouts = {}
+        resultados = verificar_alvos(s, base_url, uso_pk, alvos, historico, layouts)
+        if POLL:
+            resultados = polling_alvos(s, base_url, uso_pk, alvos, resultados, historico, layouts)
         pr("\n=== Verificação de alvos ===")
         for r in resultados:
             status = "✓ DISPONÍVEL" if r["disponivel"] else "✗ Indisponível/Não encontrado"
@@ -541,6 +737,18 @@ def main():
                 pr("[LOGOUT] uso_pk não identificado; nada a encerrar.")
         except Exception as e:
             pr(f"[LOGOUT] falha: {e}")
+        if historico is not None:
+            historico.close()
+        for linha in ras_fila.resumo_esperas(agendador):
+            pr(f"[FILA] {linha}")
+        try:
+            ras_metricas.gravar_textfile()
+        except OSError as e:
+            pr(f"[METRICAS] falha ao gravar: {e}")
 
 if __name__ == "__main__":
-    main()
+    import ras_perfil
+    if ras_perfil.ativo():
+        ras_perfil.executar_com_perfil(main, OUTDIR, log=lambda x: pr(x))
+    else:
+        main()
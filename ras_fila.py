@@ -0,0 +1,151 @@
+import os, threading, time, heapq, collections, contextlib
+
+# Fila única de requisições ao rasweb: limita taxa (token bucket) e concorrência por conta
+# e atende por prioridade estrita, para que uma reserva nunca espere atrás de tráfego menor.
+# A reserva também não consome nem espera tokens: o limite de taxa vale só para consulta
+# e navegação, e a reserva disputa apenas a concorrência.
+
+RESERVA, DETALHE, NAVEGACAO = 0, 1, 2
+NOMES = {RESERVA: "reserva", DETALHE: "detalhe", NAVEGACAO: "navegacao"}
+
+# Padrão folgado para o fluxo normal (uma requisição por RTT), mas que segura um laço
+# desgovernado antes de a conta ser bloqueada. RAS_TAXA=0 desliga o limite.
+TAXA = float(os.environ.get("RAS_TAXA", "5"))            # requisições/s
+RAJADA = float(os.environ.get("RAS_RAJADA", "10"))        # tokens acumuláveis
+CONCORRENCIA = int(os.environ.get("RAS_CONCORRENCIA", "2"))
+
+def classificar(metodo, url, data=None):
+    """Prioridade a partir do alvo do postback (__EVENTTARGET) ou da URL."""
+    alvo = data.get("__EVENTTARGET", "") if isinstance(data, dict) else ""
+    if alvo.endswith("btn_adicionar"):
+        return RESERVA
+    if alvo.endswith("btninvocadetalhe"):
+        return DETALHE
+    return NAVEGACAO
+
+class AgendadorRequisicoes:
+    """relogio: função que devolve o tempo atual em segundos (o simulador usa um relógio virtual)."""
+    def __init__(self, taxa=TAXA, rajada=RAJADA, concorrencia=CONCORRENCIA, relogio=time.monotonic):
+        self.taxa = taxa
+        self.rajada = max(rajada, 1)
+        self.concorrencia = max(concorrencia, 1)
+        self.relogio = relogio
+        self.tokens = self.rajada
+        self.ultimo = relogio()
+        self.em_uso = 0
+        self.fila = []
+        self.seq = 0
+        self.cond = threading.Condition()
+        self.esperas = {p: collections.deque(maxlen=1000) for p in NOMES}
+        self.totais = {p: [0, 0.0] for p in NOMES}
+
+    def _repor(self, agora):
+        if self.taxa > 0:
+            self.tokens = min(self.rajada, self.tokens + max(agora - self.ultimo, 0) * self.taxa)
+        else:
+            self.tokens = self.rajada
+        self.ultimo = agora
+
+    def adquirir(self, prioridade=NAVEGACAO):
+        with self.cond:
+            self.seq += 1
+            entrada = (prioridade, self.seq)
+            heapq.heappush(self.fila, entrada)
+            t0 = self.relogio()
+            isenta = prioridade == RESERVA
+            while True:
+                agora = self.relogio()
+                self._repor(agora)
+                timeout = None
+                if self.fila[0] == entrada and self.em_uso < self.concorrencia:
+                    if isenta or self.tokens >= 1:
+                        break
+                    timeout = (1 - self.tokens) / self.taxa
+                self.cond.wait(timeout)
+            heapq.heappop(self.fila)
+            if not isenta:
+                self.tokens -= 1
+            self.em_uso += 1
+            espera = self.relogio() - t0
+            self.esperas[prioridade].append(espera)
+            self.totais[prioridade][0] += 1
+            self.totais[prioridade][1] += espera
+            self.cond.notify_all()
+            return espera
+
+    def liberar(self):
+        with self.cond:
+            self.em_uso -= 1
+            self.cond.notify_all()
+
+    @contextlib.contextmanager
+    def slot(self, prioridade=NAVEGACAO):
+        espera = self.adquirir(prioridade)
+        try:
+            yield espera
+        finally:
+            self.liberar()
+
+    def estatisticas(self):
+        """Por classe: quantidade, espera média, p95 e máxima (s) na fila."""
+        out = {}
+        with self.cond:
+            for p, nome in NOMES.items():
+                n, soma = self.totais[p]
+                if not n:
+                    continue
+                recentes = sorted(self.esperas[p])
+                p95 = recentes[min(len(recentes) - 1, int(len(recentes) * 0.95))]
+                out[nome] = {"n": n, "media": soma / n, "p95": p95, "max": recentes[-1]}
+        return out
+
+class SessaoAgendada:
+    """Envolve um requests.Session: todo get/post passa pelo agendador.
+
+    Aceita prioridade=... explícita; sem ela a prioridade vem de classificar().
+    observador(metodo, url, data, resposta, duracao, espera, classe) é chamado ao fim
+    de cada requisição (resposta=None em caso de exceção).
+    """
+    def __init__(self, sessao, agendador, observador=None):
+        self.sessao = sessao
+        self.agendador = agendador
+        self.observador = observador
+
+    def request(self, metodo, url, prioridade=None, **kw):
+        if prioridade is None:
+            prioridade = classificar(metodo, url, kw.get("data"))
+        with self.agendador.slot(prioridade) as espera:
+            t0 = time.monotonic()
+            resposta = None
+            try:
+                resposta = self.sessao.request(metodo, url, **kw)
+                return resposta
+            finally:
+                if self.observador:
+                    self.observador(metodo, url, kw.get("data"), resposta, time.monotonic() - t0, espera, NOMES[prioridade])
+
+    def get(self, url, prioridade=None, **kw):
+        kw.setdefault("allow_redirects", True)
+        return self.request("GET", url, prioridade=prioridade, **kw)
+
+    def post(self, url, prioridade=None, **kw):
+        return self.request("POST", url, prioridade=prioridade, **kw)
+
+    def __getattr__(self, nome):
+        return getattr(self.sessao, nome)
+
+_agendadores = {}
+_lock = threading.Lock()
+
+def agendador_para(conta):
+    """Um agendador por conta, compartilhado por todas as sessões/threads dela."""
+    with _lock:
+        if conta not in _agendadores:
+            _agendadores[conta] = AgendadorRequisicoes()
+        return _agendadores[conta]
+
+def resumo_esperas(agendador):
+    linhas = []
+    for nome, e in agendador.estatisticas().items():
+        linhas.append(f"{nome}: n={e['n']} média={e['media']*1000:.0f}ms p95={e['p95']*1000:.0f}ms máx={e['max']*1000:.0f}ms")
+    return linhas
@@ -0,0 +1,196 @@
+import os, sys, sqlite3, datetime, collections
+
+# Histórico local das grades de vagas: cada consulta vira uma "captura" com as linhas
+# (data, período, órgão, perfil, disponível). Comparando capturas consecutivas do mesmo
+# dia obtemos eventos de liberação (vaga passou a aparecer disponível) e de ocupação.
+
+ARQUIVO_PADRAO = "ras_historico.sqlite3"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS capturas (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts TEXT NOT NULL,
+    dia_consulta TEXT NOT NULL,
+    total_linhas INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS linhas (
+    captura_id INTEGER NOT NULL REFERENCES capturas(id),
+    linha INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    periodo TEXT NOT NULL,
+    orgao TEXT NOT NULL,
+    perfil TEXT NOT NULL,
+    disponivel INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_capturas_dia_ts ON capturas(dia_consulta, ts);
+CREATE INDEX IF NOT EXISTS idx_linhas_captura ON linhas(captura_id);
+"""
+
+def caminho_padrao():
+    cfg = os.environ.get("RAS_HISTORICO", "").strip()
+    if cfg in ("0", "false", "False", "no", "n"):
+        return None
+    return cfg or os.path.join(os.environ.get("RAS_DEBUG_DIR", "."), ARQUIVO_PADRAO)
+
+def abrir(caminho=None):
+    caminho = caminho or caminho_padrao()
+    if not caminho:
+        return None
+    os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+    con = sqlite3.connect(caminho, check_same_thread=False)
+    con.executescript(SCHEMA)
+    return con
+
+def registrar_snapshot(con, dia_br, rows, ts=None):
+    ts = ts or datetime.datetime.now()
+    dia_iso = datetime.datetime.strptime(dia_br, "%d/%m/%Y").date().isoformat()
+    with con:
+        cur = con.execute("INSERT INTO capturas (ts, dia_consulta, total_linhas) VALUES (?,?,?)",
+                          (ts.isoformat(timespec="seconds"), dia_iso, len(rows)))
+        cid = cur.lastrowid
+        con.executemany("INSERT INTO linhas (captura_id, linha, data, periodo, orgao, perfil, disponivel) VALUES (?,?,?,?,?,?,?)",
+                        [(cid, i, r["data"], r["periodo"], r["orgao"], r["perfil"], int(bool(r["disponivel"])))
+                         for i, r in enumerate(rows, start=1)])
+    return cid
+
+def ultima_captura(con):
+    row = con.execute("SELECT MAX(ts) FROM capturas").fetchone()
+    return datetime.datetime.fromisoformat(row[0]) if row and row[0] else None
+
+def _vagas_por_captura(con, desde_id=0):
+    # Capturas são inseridas em ordem cronológica, então a ordem por id é a ordem temporal.
+    sql = ("SELECT c.id, c.ts, c.dia_consulta, l.data, l.periodo, l.orgao, l.perfil, l.disponivel "
+           "FROM capturas c LEFT JOIN linhas l ON l.captura_id = c.id WHERE c.id > ? ORDER BY c.id")
+    atual = None
+    for cid, ts, dia, data, periodo, orgao, perfil, disp in con.execute(sql, (desde_id,)):
+        if atual is None or atual[0] != cid:
+            if atual is not None:
+                yield atual
+            atual = (cid, datetime.datetime.fromisoformat(ts), dia, collections.Counter())
+        if data is not None and disp:
+            atual[3][(data, periodo, orgao, perfil)] += 1
+    if atual is not None:
+        yield atual
+
+def _diferencas(ts, prev, vagas, filtro=None):
+    for chave in set(prev) | set(vagas):
+        delta = vagas[chave] - prev[chave]
+        if not delta:
+            continue
+        data, periodo, orgao, perfil = chave
+        if filtro and not filtro({"data": data, "periodo": periodo, "orgao": orgao, "perfil": perfil}):
+            continue
+        yield (ts, "liberacao" if delta > 0 else "ocupacao", data, periodo, orgao, perfil, abs(delta))
+
+class Padroes:
+    """Eventos e observações por (dia da semana, hora) e por hora do dia, atualizados incrementalmente.
+
+    Um evento é atribuído à captura que primeiro o vê, então a contagem bruta segue os
+    horários em que o checker rodou; taxa() divide pelo número de capturas (que podiam
+    ver um evento) em cada faixa.
+    """
+    def __init__(self, filtro=None, tipo="liberacao"):
+        self.filtro = filtro
+        self.tipo = tipo
+        self.por_semana = collections.Counter()
+        self.por_hora = collections.Counter()
+        self.obs_semana = collections.Counter()
+        self.obs_hora = collections.Counter()
+        self.anterior = {}
+        self.ultimo_id = 0
+
+    def atualizar(self, con):
+        for cid, ts, dia, vagas in _vagas_por_captura(con, self.ultimo_id):
+            self.ultimo_id = cid
+            prev = self.anterior.get(dia)
+            self.anterior[dia] = vagas
+            if prev is None:
+                continue
+            self.obs_semana[(ts.weekday(), ts.hour)] += 1
+            self.obs_hora[ts.hour] += 1
+            for _ts, t, *_resto, qtd in _diferencas(ts, prev, vagas, self.filtro):
+                if t == self.tipo:
+                    self.por_semana[(ts.weekday(), ts.hour)] += qtd
+                    self.por_hora[ts.hour] += qtd
+        return self
+
+    def taxa_hora(self, hora):
+        n = self.obs_hora[hora]
+        return self.por_hora[hora] / n if n else 0.0
+
+    def taxa_semana(self, dia_semana, hora):
+        n = self.obs_semana[(dia_semana, hora)]
+        return self.por_semana[(dia_semana, hora)] / n if n else 0.0
+
+def padroes(con, filtro=None, tipo="liberacao"):
+    return Padroes(filtro, tipo).atualizar(con)
+
+class AgendadorPolling:
+    """Escolhe o intervalo até a próxima consulta a partir dos padrões de liberação.
+
+    Em horários com maior taxa de liberações por captura o intervalo se aproxima de
+    intervalo_min; fora deles recua até intervalo_max. Sem histórico usa intervalo_base.
+    """
+    def __init__(self, con, filtro=None, intervalo_min=20, intervalo_max=300, intervalo_base=60):
+        self.con = con
+        self.padroes = Padroes(filtro)
+        self.intervalo_min = intervalo_min
+        self.intervalo_max = intervalo_max
+        self.intervalo_base = intervalo_base
+        self.atualizar()
+
+    def atualizar(self):
+        if self.con is not None:
+            self.padroes.atualizar(self.con)
+
+    def peso(self, quando):
+        """Probabilidade relativa (0..1) de liberação na hora de 'quando'."""
+        p = self.padroes
+        max_hora = max((p.taxa_hora(h) for h in p.obs_hora), default=0)
+        if not max_hora:
+            return None
+        max_semana = max(p.taxa_semana(*k) for k in p.obs_semana)
+        p_hora = p.taxa_hora(quando.hour) / max_hora
+        p_semana = p.taxa_semana(quando.weekday(), quando.hour) / max_semana
+        return 0.6 * p_semana + 0.4 * p_hora
+
+    def proximo_intervalo(self, agora=None):
+        agora = agora or datetime.datetime.now()
+        peso = self.peso(agora)
+        if peso is None:
+            return self.intervalo_base
+        intervalo = self.intervalo_max - (self.intervalo_max - self.intervalo_min) * peso
+        # Se uma hora "quente" começa antes do fim do intervalo, acorda no início dela.
+        inicio_prox = agora.replace(minute=0, second=0, microsecond=0) + datetime.timedelta(hours=1)
+        ate_prox = (inicio_prox - agora).total_seconds()
+        if ate_prox < intervalo and (self.peso(inicio_prox) or 0) > peso:
+            intervalo = max(ate_prox, self.intervalo_min)
+        return intervalo
+
+def main():
+    import ras_checker
+    if len(sys.argv) < 2:
+        print("Uso: python ras_historico.py \"32ª DP\" [\"08:00 - 19:59\"] [liberacao|ocupacao]")
+        sys.exit(1)
+    orgao_req = sys.argv[1]
+    periodo = sys.argv[2] if len(sys.argv) > 2 else ""
+    tipo = sys.argv[3] if len(sys.argv) > 3 else "liberacao"
+    con = abrir()
+    if con is None:
+        print("Histórico desativado (RAS_HISTORICO=0).")
+        sys.exit(1)
+    key = ras_checker.orgao_key_from_req(orgao_req)
+    filtro = lambda r: ras_checker.matches_orgao(r["orgao"], key) and (not periodo or r["periodo"] == periodo)
+    p = padroes(con, filtro, tipo)
+    total = sum(p.por_hora.values())
+    print(f"{tipo} para {orgao_req}{' ' + periodo if periodo else ''}: {total} vaga(s)")
+    print("  hora  vagas capturas  vagas/captura | por dia da semana")
+    dias = ["seg", "ter", "qua", "qui", "sex", "sáb", "dom"]
+    for hora in range(24):
+        if not p.obs_hora[hora]:
+            continue
+        detalhe = ", ".join(f"{dias[d]}={p.por_semana[(d, hora)]}/{p.obs_semana[(d, hora)]}" for d in range(7) if p.obs_semana[(d, hora)])
+        print(f"  {hora:02d}h: {p.por_hora[hora]:5d} {p.obs_hora[hora]:8d} {p.taxa_hora(hora):14.3f} | {detalhe}")
+
+if __name__ == "__main__":
+    main()
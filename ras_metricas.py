@@ -0,0 +1,165 @@
+import os, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Métricas no formato texto do Prometheus, para processos longos (polling).
+# RAS_METRICS_PORT expõe /metrics via HTTP; RAS_METRICS_FILE grava o mesmo conteúdo
+# num arquivo (textfile collector do node_exporter).
+
+METRICS_PORT = os.environ.get("RAS_METRICS_PORT", "").strip()
+METRICS_FILE = os.environ.get("RAS_METRICS_FILE", "").strip()
+
+BUCKETS_LATENCIA = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+_lock = threading.Lock()
+_metricas = []
+
+def _rotulos(nomes, valores):
+    if not nomes:
+        return ""
+    pares = ",".join(f'{n}="{str(v)}"' for n, v in zip(nomes, valores))
+    return "{" + pares + "}"
+
+class Contador:
+    tipo = "counter"
+    def __init__(self, nome, ajuda, rotulos=()):
+        self.nome, self.ajuda, self.rotulos = nome, ajuda, tuple(rotulos)
+        self.valores = {}
+        _metricas.append(self)
+
+    def inc(self, *rotulos, valor=1):
+        with _lock:
+            self.valores[rotulos] = self.valores.get(rotulos, 0) + valor
+
+    def amostras(self):
+        return [(self.nome + _rotulos(self.rotulos, k), v) for k, v in sorted(self.valores.items())]
+
+class Medidor:
+    tipo = "gauge"
+    def __init__(self, nome, ajuda, funcao):
+        self.nome, self.ajuda, self.funcao = nome, ajuda, funcao
+        _metricas.append(self)
+
+    def amostras(self):
+        v = self.funcao()
+        return [] if v is None else [(self.nome, v)]
+
+class Histograma:
+    tipo = "histogram"
+    def __init__(self, nome, ajuda, rotulos=(), buckets=BUCKETS_LATENCIA):
+        self.nome, self.ajuda, self.rotulos = nome, ajuda, tuple(rotulos)
+        self.buckets = tuple(buckets)
+        self.valores = {}
+        _metricas.append(self)
+
+    def observar(self, valor, *rotulos):
+        with _lock:
+            contagens, soma, n = self.valores.get(rotulos, ([0] * len(self.buckets), 0.0, 0))
+            contagens = [c + (valor <= b) for c, b in zip(contagens, self.buckets)]
+            self.valores[rotulos] = (contagens, soma + valor, n + 1)
+
+    def amostras(self):
+        out = []
+        for k, (contagens, soma, n) in sorted(self.valores.items()):
+            for b, c in zip(self.buckets, contagens):
+                out.append((self.nome + "_bucket" + _rotulos(self.rotulos + ("le",), k + (b,)), c))
+            out.append((self.nome + "_bucket" + _rotulos(self.rotulos + ("le",), k + ("+Inf",)), n))
+            out.append((self.nome + "_sum" + _rotulos(self.rotulos, k), soma))
+            out.append((self.nome + "_count" + _rotulos(self.rotulos, k), n))
+        return out
+
+_ultima_grade = [None]
+
+def marcar_grade(ts=None):
+    """Registra a grade mais recente (agora, ou o epoch ts da última captura do histórico)."""
+    _ultima_grade[0] = time.time() if ts is None else ts
+
+REQUISICOES = Contador("ras_requisicoes_total", "Requisições ao rasweb por etapa e status HTTP.", ("etapa", "codigo"))
+LATENCIA = Histograma("ras_latencia_segundos", "Latência das requisições (sem a espera na fila) por etapa.", ("etapa",))
+ESPERA_FILA = Histograma("ras_espera_fila_segundos", "Espera na fila do agendador de requisições por classe.", ("classe",),
+                         buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5))
+BYTES = Contador("ras_bytes_total", "Bytes de corpo transferidos.", ("direcao",))
+RESERVAS = Contador("ras_reservas_total", "Tentativas de reserva por modo e resultado.", ("modo", "resultado"))
+# Só os caminhos de recuperação que o fluxo trata explicitamente: sessão duplicada assumida no
+# login e redirect MS-AJAX refeito em https. Falhas sem nova tentativa não aparecem aqui.
+RECUPERACOES = Contador("ras_recuperacoes_sessao_total",
+                        "Sessões recuperadas: sessao_duplicada (sessão anterior assumida) ou fallback_https (redirect refeito em https).",
+                        ("motivo",))
+IDADE_GRADE = Medidor("ras_idade_grade_segundos", "Idade da grade de vagas mais recente.",
+                      lambda: None if _ultima_grade[0] is None else time.time() - _ultima_grade[0])
+
+def etapa_de(metodo, url, data=None):
+    alvo = data.get("__EVENTTARGET", "") if isinstance(data, dict) else ""
+    u = url.lower()
+    if "p_login.aspx" in u:
+        return "login"
+    if u.endswith("/getusercontrol"):
+        return "getusercontrol"
+    if alvo.endswith("btn_adicionar"):
+        return "reserva"
+    if alvo.endswith("btninvocadetalhe"):
+        return "detalhe"
+    if "encerra.aspx" in u:
+        return "logout"
+    return "navegacao"
+
+def observar_requisicao(metodo, url, data, resposta, duracao, espera, classe):
+    """Observador para ras_fila.SessaoAgendada; resposta é None quando a requisição falhou."""
+    etapa = etapa_de(metodo, url, data)
+    REQUISICOES.inc(etapa, resposta.status_code if resposta is not None else "erro")
+    LATENCIA.observar(duracao, etapa)
+    ESPERA_FILA.observar(espera, classe)
+    if resposta is not None:
+        BYTES.inc("recebido", valor=len(getattr(resposta, "content", b"") or b""))
+        corpo = getattr(getattr(resposta, "request", None), "body", None)
+        if corpo:
+            BYTES.inc("enviado", valor=len(corpo))
+
+def reserva(ok, modo="normal"):
+    RESERVAS.inc(modo, "sucesso" if ok else "falha")
+
+def exposicao():
+    linhas = []
+    with _lock:
+        for m in _metricas:
+            amostras = m.amostras()
+            linhas.append(f"# HELP {m.nome} {m.ajuda}")
+            linhas.append(f"# TYPE {m.nome} {m.tipo}")
+            for nome, v in amostras:
+                linhas.append(f"{nome} {v}")
+    return "\n".join(linhas) + "\n"
+
+def gravar_textfile(caminho=None):
+    caminho = caminho or METRICS_FILE
+    if not caminho:
+        return
+    tmp = caminho + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(exposicao())
+    os.replace(tmp, caminho)
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        corpo = exposicao().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, *args):
+        pass
+
+_servidor = [None]
+
+def servir(porta=None, host="127.0.0.1"):
+    """Sobe (uma vez por processo) o endpoint /metrics numa thread daemon."""
+    porta = porta or METRICS_PORT
+    if not porta or _servidor[0] is not None:
+        return _servidor[0]
+    srv = ThreadingHTTPServer((host, int(porta)), _Handler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    _servidor[0] = srv
+    return srv
@@ -0,0 +1,128 @@
+import os, io, sys, time, datetime, threading, tracemalloc, cProfile, pstats
+
+# Modo de perfilamento (RAS_PROFILE=1 ou checkbox na GUI): roda a verificação sob cProfile
+# e tracemalloc e grava um relatório por execução ao lado dos dumps.
+#
+# cProfile só enxerga a thread em que foi ligado; threads novas (ex.: worker do pipeline)
+# ganham um Profile próprio via threading.setprofile e tudo é somado no relatório.
+# A partir do Python 3.12 o cProfile usa sys.monitoring, que vale para o interpretador
+# inteiro e admite um só profiler ativo: o Profile da thread principal já registra todas
+# as threads, com as chamadas delas misturadas na mesma árvore (o relatório avisa).
+# Como as maiores alocações costumam ser temporárias (árvores do BeautifulSoup, .upper()
+# do documento inteiro), uma thread amostra snapshots do tracemalloc e guarda o do pico.
+
+TOP = int(os.environ.get("RAS_PROFILE_TOP", "25"))
+FRAMES = 30
+POR_THREAD = sys.version_info < (3, 12)
+AMOSTRA_S = float(os.environ.get("RAS_PROFILE_AMOSTRA", "0.2"))
+
+def ativo():
+    return os.environ.get("RAS_PROFILE", "0").strip() not in ("0", "false", "False", "no", "n", "")
+
+class _Amostrador(threading.Thread):
+    def __init__(self, intervalo):
+        super().__init__(daemon=True)
+        self.intervalo = intervalo
+        self.parar = threading.Event()
+        self.pico = 0
+        self.snapshot_pico = None
+
+    def amostrar(self):
+        atual, _ = tracemalloc.get_traced_memory()
+        if atual > self.pico:
+            self.pico = atual
+            self.snapshot_pico = tracemalloc.take_snapshot()
+
+    def run(self):
+        while not self.parar.wait(self.intervalo):
+            self.amostrar()
+
+def _filtrar(snapshot):
+    return snapshot.filter_traces([tracemalloc.Filter(False, tracemalloc.__file__),
+                                   tracemalloc.Filter(False, "<frozen importlib._bootstrap*>")])
+
+def _alocacoes(snapshot, top):
+    linhas = []
+    for st in _filtrar(snapshot).statistics("traceback")[:top]:
+        frames = list(st.traceback)[::-1]  # do ponto de alocação para fora
+        linhas.append(f"{st.size/1024:10.1f} KiB {st.count:8d} blocos  {frames[0].filename}:{frames[0].lineno}")
+        for f in frames[1:3]:
+            linhas.append(f"{'':31s}<- {f.filename}:{f.lineno}")
+        origem = next((f for f in frames if os.path.basename(f.filename).startswith("ras_")), None)
+        if origem is not None:
+            linhas.append(f"{'':31s}origem: {origem.filename}:{origem.lineno}")
+    return linhas
+
+def executar_com_perfil(func, outdir=".", nome="run", log=print, top=TOP):
+    """Executa func() perfilando CPU e memória; grava perfil_<nome>_<ts>.txt/.prof em outdir."""
+    perfis = []
+    lock = threading.Lock()
+
+    def por_thread(frame, event, arg):
+        # Nunca pode derrubar a thread perfilada: na falha ela segue sem perfil.
+        sys.setprofile(None)
+        try:
+            p = cProfile.Profile()
+            p.enable()
+        except Exception:
+            return
+        with lock:
+            perfis.append(p)
+
+    tracemalloc.start(FRAMES)
+    amostrador = _Amostrador(AMOSTRA_S)
+    amostrador.start()
+    principal = cProfile.Profile()
+    if POR_THREAD:
+        threading.setprofile(por_thread)
+    t0 = time.perf_counter()
+    principal.enable()
+    try:
+        return func()
+    finally:
+        principal.disable()
+        if POR_THREAD:
+            threading.setprofile(None)
+        duracao = time.perf_counter() - t0
+        amostrador.parar.set()
+        amostrador.join()
+        amostrador.amostrar()
+        _, pico = tracemalloc.get_traced_memory()
+        final = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        try:
+            caminho = _gravar_relatorio(principal, perfis, amostrador.snapshot_pico or final, final,
+                                        duracao, pico, outdir, nome, top)
+            log(f"[PERFIL] relatório -> {caminho}")
+        except Exception as e:
+            log(f"[PERFIL] falha ao gravar relatório: {e}")
+
+def _gravar_relatorio(principal, perfis, snap_pico, snap_final, duracao, pico, outdir, nome, top):
+    ts = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    base = os.path.join(outdir, f"perfil_{nome}_{ts}")
+    os.makedirs(outdir or ".", exist_ok=True)
+    stats = pstats.Stats(principal)
+    for p in perfis:
+        try:
+            stats.add(p)
+        except TypeError:
+            pass  # thread que não chegou a executar nada perfilado
+    stats.dump_stats(base + ".prof")
+    saida = io.StringIO()
+    saida.write(f"Perfil {nome} {ts}\n")
+    threads = 1 + len(perfis) if POR_THREAD else "todas, num único perfil"
+    saida.write(f"duração: {duracao:.3f}s | threads perfiladas: {threads} | pico de memória rastreada: {pico/1024/1024:.1f} MiB\n")
+    if not POR_THREAD:
+        saida.write("CPU de todas as threads misturada na mesma árvore de chamadas (cProfile do Python 3.12+)\n")
+    saida.write("\n")
+    for titulo, chave in (("CPU: tempo acumulado", "cumulative"), ("CPU: tempo próprio", "tottime")):
+        saida.write(f"=== {titulo} (top {top}) ===\n")
+        stats.stream = saida
+        stats.sort_stats(chave).print_stats(top)
+    saida.write(f"=== Memória: maiores alocações vivas no pico (top {top}) ===\n")
+    saida.write("\n".join(_alocacoes(snap_pico, top)) + "\n\n")
+    saida.write(f"=== Memória: alocações vivas no fim (top {top}) ===\n")
+    saida.write("\n".join(_alocacoes(snap_final, top)) + "\n")
+    with open(base + ".txt", "w", encoding="utf-8") as f:
+        f.write(saida.getvalue())
+    return base + ".txt"